@@ -1,11 +1,150 @@
 import ast
-import re
+import time
+import token
 
-__all__ = ('ASTFormatter',)
+__all__ = ('ASTFormatter', 'BackendMismatch', 'FormatBudgetExceeded', 'TokenStream', 'WHITESPACE')
 
 import sys
 # for sys.version
 
+# _clock measures the elapsed time for the formatter's timeout budget.
+_clock = getattr(time, 'monotonic', time.time)
+
+# _RecursionError is raised when a tree is too deep to format.
+try:
+    _RecursionError = RecursionError
+except NameError:
+    # python 2 raises a plain RuntimeError.
+    _RecursionError = RuntimeError
+
+def _too_deep(error):
+    """Return True if `error`, a _RecursionError, was raised because
+    the python recursion limit was exceeded.
+    """
+    if _RecursionError is not RuntimeError:
+        return True
+    return str(error).startswith("maximum recursion depth exceeded")
+
+########################################################################
+# The _LazyRegex class holds a regular expression as a class attribute,
+# deferring the import of `re` and the compilation of the expression
+# until the attribute is first used, so that importing astformatter
+# stays cheap.
+
+class _LazyRegex(object):
+    """A class attribute which compiles `pattern` on first access and
+    returns the compiled regular expression.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.regex = None
+
+    def __get__(self, instance, owner):
+        if self.regex is None:
+            import re
+            self.regex = re.compile(self.pattern)
+        return self.regex
+
+########################################################################
+# The TokenStream class holds the (token type, text) pairs produced by
+# ASTFormatter.tokens().  Token types are the constants from the `token`
+# module, plus WHITESPACE for the spacing between tokens on a line, so
+# that joining the text of every token reproduces ASTFormatter.format().
+
+# WHITESPACE sits just below token.NT_OFFSET, where it cannot collide
+# with a terminal token type and still fits in an unsigned byte.
+WHITESPACE = token.NT_OFFSET - 1
+
+class TokenStream(object):
+    """A compact sequence of (token type, text) pairs.  The token
+    types are kept in an unsigned byte array parallel to the list of
+    token texts.
+    """
+
+    def __init__(self):
+        from array import array
+        self.types = array('B')
+        self.texts = []
+
+    def append(self, toktype, text):
+        self.types.append(toktype)
+        self.texts.append(text)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, index):
+        return (self.types[index], self.texts[index])
+
+    def __iter__(self):
+        return iter(zip(self.types, self.texts))
+
+    def render(self):
+        """Return the source code represented by the token stream."""
+        return "".join(self.texts)
+
+########################################################################
+# FormatBudgetExceeded is raised when formatting an AST tree exceeds
+# one of the resource budgets given to the ASTFormatter.
+
+class FormatBudgetExceeded(RuntimeError):
+    """Raised by ASTFormatter.format() when formatting exceeds one of
+    the formatter's resource budgets.  `budget` names the budget that
+    was exceeded ('max_nodes', 'max_depth', 'max_output' or 'timeout')
+    and `limit` is its configured value.  A tree too deep for the
+    python recursion limit is reported as exceeding 'max_depth', with
+    whatever limit was configured.  The remaining attributes report how far
+    formatting got: `nodes` is the number of nodes visited, `output`
+    the length of the top-level statements formatted, `elapsed` the
+    number of seconds spent, `context` the types of the nodes being
+    formatted when formatting stopped, innermost first, and `depth` the
+    number of nodes in `context`.  The formatter only counts `nodes`
+    and `output` while it has a budget, so they are None when no budget
+    was configured; `output` is also None in 'eval' mode, which formats
+    no statements.
+    """
+
+    def __init__(self, budget, limit, nodes, output, elapsed, context):
+        # context ends with the root type for the format() mode.
+        depth = max(len(context) - 1, 0)
+        counted = []
+        if nodes is not None:
+            counted.append("%d nodes" % (nodes,))
+        if output is not None:
+            counted.append("%d characters" % (output,))
+        counted = ", ".join(counted)
+        if counted:
+            counted += " and "
+        super(FormatBudgetExceeded, self).__init__(
+            "ASTFormatter exceeded %s=%r at depth %d after %s%.3f seconds" % (
+                budget, limit, depth, counted, elapsed))
+        self.budget = budget
+        self.limit = limit
+        self.nodes = nodes
+        self.output = output
+        self.elapsed = elapsed
+        self.context = context
+        self.depth = depth
+
+########################################################################
+# BackendMismatch is raised when a sampled equivalence check finds
+# that a backend's output does not match the astformatter backend's.
+
+class BackendMismatch(ValueError):
+    """Raised by ASTFormatter.format() when a sampled equivalence
+    check finds that the source produced by `backend` reparses neither
+    to the formatted tree nor to the same AST as the source produced by
+    the astformatter backend.
+    """
+
+    def __init__(self, backend, mode):
+        super(BackendMismatch, self).__init__(
+            "ASTFormatter backend %r does not reparse to the formatted tree or to the astformatter backend's AST in %r mode" % (
+                backend, mode))
+        self.backend = backend
+        self.mode = mode
+
 ########################################################################
 # The ASTFormatter class walks an AST and produces properly formatted
 # python code for that AST.
@@ -28,6 +167,25 @@ class ASTFormatter(ast.NodeVisitor):
         tree = ast.parse(open('modulefile.py'), 'modulefile.py', mode='exec')
         src  = ASTFormatter().format(tree, mode='exec')
 
+    The formatting engine is chosen by the ``backend`` argument: ``'astformatter'`` (the default) uses the visitor methods of this class, ``'unparse'`` delegates to ``ast.unparse`` on Python 3.9+, and ``'auto'`` uses whichever backend ``ASTFormatter.calibrate()`` measured as fastest, provided that it takes at most half the time of the ``'astformatter'`` backend; the backends differ in output style, and the margin keeps timing noise from switching ``'auto'`` between them from one process to the next.  Subclasses that override a visitor method are always formatted by the ``'astformatter'`` backend under ``'auto'``, and ``check_backends()`` reports the backends whose output does not reparse to the same AST::
+
+        src  = ASTFormatter(backend='auto', verify=0.01).format(tree, mode='exec')
+        assert ASTFormatter().check_backends(tree, mode='exec') == []
+
+    The same source is available as a stream of ``(token type, text)`` pairs, using the token types from the ``token`` module::
+
+        tokens = ASTFormatter().tokens(tree, mode='exec')
+        assert tokens.render() == src
+
+    Large modules can be generated one statement at a time, either synchronously or, on Python 3.6+, from an asyncio event loop which regains control between time slices::
+
+        for chunk in ASTFormatter().iterformat(tree, mode='exec'):
+            out.write(chunk)
+
+        from astformatter.aio import aformat
+        async for chunk in aformat(tree, mode='exec', timeslice=0.005):
+            out.write(chunk)
+
     Bugs
     ----
 
@@ -56,13 +214,50 @@ class ASTFormatter(ast.NodeVisitor):
 
     __version__ = '0.6.2'
 
-    def __init__(self):
-        """Return a new ASTFormatter object."""
+    def __init__(self, max_nodes=None, max_output=None, timeout=None, max_depth=None,
+            backend='astformatter', verify=0):
+        """Return a new ASTFormatter object.  The optional budgets
+        limit each call to format() to visiting `max_nodes` nodes,
+        nesting `max_depth` nodes deep, producing `max_output` characters of source, and running for
+        `timeout` seconds; format() raises FormatBudgetExceeded as soon
+        as any of them is exceeded.
+
+        `backend` names the backend which formats each tree, or is
+        'auto' to use the fastest calibrated backend.  `verify` is the
+        fraction of calls to format() handled by another backend that
+        are checked against the astformatter backend; a mismatch raises
+        BackendMismatch.  Budgets and tokens() always use the
+        astformatter backend.
+        """
+        if backend != 'auto' and not (isinstance(backend, str) and hasattr(self, 'backend_' + backend)):
+            raise ValueError("ASTFormatter() expected 'auto' or one of %s for backend, got %r" % (
+                ", ".join([repr(name) for name in self.backends()]), backend))
+        self.backend = backend
+        self.verify = verify
+        # verify accumulates into __verify_due; a check is due
+        # whenever it reaches one.
+        self.__verify_due = 0
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.max_output = max_output
+        self.timeout = timeout
         # initialize the context to empty; every call to format()
         # will introduce a new context for that call, and every
         # node visited will have that node pushed to the top of the
         # stack and popped after the visitor returns.
         self.context = []
+        # budget counters, reset by every call to format().
+        self.__budgeted = False
+        self.__nodes = 0
+        self.__output = 0
+        self.__started = None
+        # while iterformat() formats a statement, __process_body
+        # appends the bodies it leaves for later steps to this list,
+        # along with their indent and context.
+        self.__deferred = None
+        # when set, visit() marks up the output of leaf nodes with
+        # their token type so that tokens() can split them back out.
+        self.__tokenizing = False
 
     def format(self, AST, mode='exec'):
         """Accept an AST tree and return a properly formatted Python
@@ -73,16 +268,382 @@ class ASTFormatter(ast.NodeVisitor):
         """
         if not isinstance(AST, ast.AST):
             raise TypeError("ASTFormatter.format() expected AST got " + type(AST).__name__)
+        depth = len(self.context)
         if mode == 'exec':
             self.context.insert(0, ast.Module)
         elif mode == 'eval':
             self.context.insert(0, ast.expr)
         else:
             raise ValueError("ASTFormatter.format() expected either 'eval' or 'exec' for mode, got " + repr(mode))
-        formatted = "".join(self.visit(AST))
-        self.context.pop(0)
+        self.__start_budgets()
+        if mode == 'eval':
+            # there are no statements to count the output of.
+            self.__output = None
+        backend = self.__select_backend()
+        try:
+            formatted = getattr(self, 'backend_' + backend)(AST, mode)
+        except FormatBudgetExceeded:
+            # under python 2, this is also a _RecursionError.
+            raise
+        except _RecursionError as e:
+            if not _too_deep(e):
+                raise
+            self.__exceeded('max_depth', self.max_depth)
+        finally:
+            # drop whatever context an aborted visit left behind.
+            del self.context[:len(self.context) - depth]
+        if backend != 'astformatter' and self.verify:
+            self.__verify_due += self.verify
+            if self.__verify_due >= 1:
+                self.__verify_due -= 1
+                if backend in self.check_backends(AST, mode, (backend,)):
+                    raise BackendMismatch(backend, mode)
         return formatted
 
+    def iterformat(self, AST, mode='exec'):
+        """Accept an AST tree and generate the same source as format(),
+        in chunks.  In 'exec' mode, module and statement trees are
+        formatted one statement at a time: each chunk holds the source
+        of one simple statement, or the lines of a compound statement
+        up to the next of its bodies with more than one statement, and
+        the statements of those bodies are generated in later chunks.
+        Any other tree, a tree routed to a backend other than
+        astformatter, or a tree formatted by a subclass which overrides
+        visit_Module or a statement visitor, is generated as a single
+        chunk.
+        """
+        if mode == 'exec' and isinstance(AST, ast.Module):
+            stmtlist = AST.body
+        elif mode == 'exec' and isinstance(AST, ast.stmt):
+            stmtlist = [AST]
+        else:
+            stmtlist = None
+        self.__start_budgets()
+        if (stmtlist is None or self.__select_backend() != 'astformatter'
+                or self.__hooks_statements()):
+            yield self.format(AST, mode)
+            return
+        for chunk in self.__iterbody(stmtlist, "", [ast.Module] + self.context):
+            yield chunk
+
+    def __iterbody(self, stmtlist, indent, context):
+        """Generate the chunks of source for a body block consisting
+        of a list of statements, each line prefixed by `indent`, and
+        visited with `context` as the context of the block.
+        """
+        for stmt in stmtlist:
+            deferred = []
+            outer = self.context[:]
+            self.context[:] = context
+            self.__deferred = deferred
+            try:
+                stmts = self.visit(stmt)
+            except FormatBudgetExceeded:
+                raise
+            except _RecursionError as e:
+                if not _too_deep(e):
+                    raise
+                self.__exceeded('max_depth', self.max_depth)
+            finally:
+                self.__deferred = None
+                self.context[:] = outer
+            if not isinstance(stmts, list):
+                stmts = [stmts]
+            chunk = []
+            for line in stmts:
+                marker = self.re_deferred_body.match(line)
+                if marker is None:
+                    chunk.append("%s%s" % (indent, line))
+                    continue
+                if chunk:
+                    yield self.__count_output("".join(chunk))
+                    chunk = []
+                (body, body_indent, body_context) = deferred[int(marker.group(2))]
+                for subchunk in self.__iterbody(body, indent + marker.group(1) + body_indent, body_context):
+                    yield subchunk
+            if chunk:
+                yield self.__count_output("".join(chunk))
+
+    def __count_output(self, chunk):
+        """Add a chunk generated by iterformat() to the output formatted
+        so far, check it against the max_output budget, and return it.
+        """
+        if self.__budgeted:
+            self.__output += len(chunk)
+            if self.max_output is not None and self.__output > self.max_output:
+                self.__exceeded('max_output', self.max_output)
+        return chunk
+
+    def __hooks_statements(self):
+        """Return True if the class of this formatter overrides a
+        visitor which iterformat() relies on to defer statement bodies.
+        """
+        statements = set()
+        for base in (ast.mod, ast.stmt, ast.excepthandler):
+            statements.update(['visit_' + nodetype.__name__ for nodetype in base.__subclasses__()])
+        for name in self.__overridden():
+            if name in ('visit', 'generic_visit') or name in statements:
+                return True
+        return False
+
+    # re_deferred_body matches the line which __process_body returns in
+    # place of a body deferred by iterformat().
+    re_deferred_body = _LazyRegex(r'^( *)\x05([0-9]+)\n$')
+
+    ####################################################################
+    # backends - each backend_<name> method accepts an AST tree and
+    # the format() mode, and returns the formatted source.
+
+    def backend_astformatter(self, AST, mode):
+        """Format `AST` with the visitor methods of this class."""
+        return "".join(self.visit(AST))
+
+    if hasattr(ast, 'unparse'):
+        def backend_unparse(self, AST, mode):
+            """Format `AST` with `ast.unparse`."""
+            formatted = ast.unparse(AST)
+            if mode == 'exec' and formatted:
+                formatted += "\n"
+            return formatted
+
+    @classmethod
+    def backends(cls):
+        """Return the names of the available backends."""
+        return [name[len('backend_'):] for name in dir(cls) if name.startswith('backend_')]
+
+    # _calibration_source is the sample module timed by calibrate().
+    # It sticks to syntax which every supported python version parses
+    # and the astformatter backend formats.
+    _calibration_source = """
+import sys
+from os import path as p
+
+class Sample(object):
+    \'\'\'A sample class.\'\'\'
+    limit = 10
+
+    def __init__(self, items, lookup, scale=2):
+        self.items = [item * scale for item in items if item]
+        self.lookup = dict([(key, value) for (key, value) in lookup.items()])
+
+    def total(self):
+        result = 0
+        for item in self.items:
+            if item > self.limit and not item % 3:
+                result += item ** 2 - (item << 1)
+            elif item < 0:
+                continue
+            else:
+                result -= item // 2
+        return result
+
+def main(argv):
+    try:
+        sample = Sample([int(arg) for arg in argv[1:]], {'key': p.sep})
+    except ValueError as e:
+        raise SystemExit(str(e))
+    while sample.items:
+        sample.items.pop()
+    return sample.total() if sample.items else None
+"""
+
+    # _calibration holds the seconds taken by each backend of a class
+    # to format _calibration_source, as measured by calibrate().
+    _calibration = None
+
+    # _calibration_margin is the fraction of the astformatter backend's
+    # calibrated time which another backend must stay within for 'auto'
+    # to use it.
+    _calibration_margin = 0.5
+
+    @classmethod
+    def calibrate(cls, number=5):
+        """Time each backend formatting a bundled sample module,
+        keeping the best of `number` runs, and return a dictionary of
+        backend names to seconds.  The 'auto' backend uses the fastest
+        of these if it takes at most half the time of the astformatter
+        backend, and the astformatter backend otherwise, so that its
+        choice does not vary with timing noise; it calls calibrate()
+        itself on first use.  Backends which fail to format the sample
+        are left out.
+        """
+        tree = ast.parse(cls._calibration_source)
+        # subclasses may take other constructor arguments, so set up
+        # the formatter the way ASTFormatter would.
+        formatter = cls.__new__(cls)
+        ASTFormatter.__init__(formatter)
+        timings = {}
+        for backend in cls.backends():
+            probe = formatter.__probe(backend)
+            best = None
+            try:
+                for i in range(number):
+                    started = _clock()
+                    probe.format(tree)
+                    elapsed = _clock() - started
+                    if best is None or elapsed < best:
+                        best = elapsed
+            except Exception:
+                continue
+            timings[backend] = best
+        cls._calibration = timings
+        return timings
+
+    def __probe(self, backend):
+        """Return a copy of this formatter which formats with
+        `backend`, without budgets or sampled equivalence checks.
+        """
+        import copy
+        probe = copy.copy(self)
+        probe.backend = backend
+        probe.verify = 0
+        probe.max_nodes = probe.max_depth = probe.max_output = probe.timeout = None
+        probe.context = []
+        return probe
+
+    def __select_backend(self):
+        """Return the name of the backend for the current call to
+        format().
+        """
+        if self.__tokenizing or self.__budgeted:
+            return 'astformatter'
+        if self.backend != 'auto':
+            return self.backend
+        for name in self.__overridden():
+            if name.startswith('visit') or name == 'generic_visit':
+                # keep the subclass's hooks in effect.
+                return 'astformatter'
+        cls = type(self)
+        if cls.__dict__.get('_calibration') is None:
+            cls.calibrate()
+        timings = cls._calibration
+        if not timings:
+            return 'astformatter'
+        fastest = min(sorted(timings), key=timings.get)
+        if 'astformatter' in timings and timings[fastest] > timings['astformatter'] * self._calibration_margin:
+            # the backends differ in output style; keep astformatter's
+            # unless the other backend is clearly faster.
+            return 'astformatter'
+        return fastest
+
+    def __overridden(self):
+        """Return the names of the attributes defined by the subclasses
+        of ASTFormatter which this formatter is an instance of.
+        """
+        names = set()
+        for klass in type(self).__mro__:
+            if klass is ASTFormatter:
+                break
+            names.update(vars(klass))
+        return names
+
+    def check_backends(self, AST, mode='exec', backends=None):
+        """Format `AST` with each of `backends` (by default, every
+        available backend) and return the names of those whose output
+        reparses neither to `AST` itself nor to the same AST as the
+        output of the astformatter backend.
+        """
+        if backends is None:
+            backends = self.backends()
+        if mode == 'eval':
+            original = [ast.dump(AST)]
+        elif isinstance(AST, ast.Module):
+            original = [ast.dump(stmt) for stmt in AST.body]
+        elif isinstance(AST, ast.stmt):
+            original = [ast.dump(AST)]
+        else:
+            original = None
+        expected = self.__reparse(self.__probe('astformatter'), AST, mode)
+        mismatched = []
+        for backend in backends:
+            formatted = self.__reparse(self.__probe(backend), AST, mode)
+            if formatted is None or (formatted != expected and formatted != original):
+                mismatched.append(backend)
+        return mismatched
+
+    def __reparse(self, formatter, AST, mode):
+        """Format `AST` with `formatter`, parse the result, and return
+        the dumps of the statements (or, in 'eval' mode, of the
+        expression) it parses to, or None if it cannot be formatted or
+        does not parse.
+        """
+        try:
+            formatted = formatter.format(AST, mode)
+            if mode == 'eval':
+                return [ast.dump(ast.parse(formatted, mode='eval').body)]
+            return [ast.dump(stmt) for stmt in ast.parse(formatted).body]
+        except Exception:
+            return None
+
+    def tokens(self, AST, mode='exec', compact=True):
+        """Accept an AST tree and return the tokens of the Python
+        source that format() would produce for it, as (token type,
+        text) pairs.  Names, operators and literals are typed by the
+        visitors that produce them; NEWLINE, INDENT and DEDENT tokens
+        come from the statement layout.  If compact is true, return a
+        TokenStream; otherwise, return a list of tuples.
+
+        The visitors still build source strings: while tokenizing,
+        visit() marks up the source of each leaf node with its token
+        type, and the marked-up source is then split by re_token_scan.
+        Only the text outside the leaf nodes - keywords, punctuation
+        and layout - is scanned without a known type.
+        """
+        self.__tokenizing = True
+        try:
+            formatted = self.format(AST, mode)
+        finally:
+            self.__tokenizing = False
+        if compact:
+            stream = TokenStream()
+            emit = stream.append
+        else:
+            stream = []
+            emit = lambda toktype, text: stream.append((toktype, text))
+        indents = [0]
+        last_op_marked = False
+        for match in self.re_token_scan.finditer(formatted):
+            kind = match.lastgroup
+            op_marked = False
+            if kind == 'marked':
+                toktype = int(match.group('marktype'))
+                emit(toktype, match.group('marked'))
+                op_marked = (toktype == token.OP)
+            elif kind == 'indent':
+                emit(token.NEWLINE, "\n")
+                indent = match.group('indent')
+                if match.end() == len(formatted):
+                    pass
+                elif len(indent) > indents[-1]:
+                    indents.append(len(indent))
+                    emit(token.INDENT, indent)
+                else:
+                    while len(indent) < indents[-1]:
+                        indents.pop()
+                        emit(token.DEDENT, "")
+                    if indent:
+                        emit(WHITESPACE, indent)
+            elif kind == 'space':
+                emit(WHITESPACE, match.group())
+            elif kind == 'name':
+                emit(token.NAME, match.group())
+            elif kind == 'number':
+                emit(token.NUMBER, match.group())
+            elif match.group() == '=' and last_op_marked:
+                # augmented assignment: the operator visitor returned
+                # the "+" of "+=", so join the two back together.
+                if compact:
+                    stream.texts[-1] += "="
+                else:
+                    stream[-1] = (token.OP, stream[-1][1] + "=")
+            else:
+                emit(token.OP, match.group())
+            last_op_marked = op_marked
+        for indent in indents[1:]:
+            emit(token.DEDENT, "")
+        emit(token.ENDMARKER, "")
+        return stream
+
     ####################################################################
     # helper methods
 
@@ -95,10 +656,45 @@ class ASTFormatter(ast.NodeVisitor):
         FIXME: Only return lists of strings from non-expression nodes.
         """
         self.context.insert(0, node.__class__)
+        if self.__budgeted:
+            self.__nodes += 1
+            if self.max_nodes is not None and self.__nodes > self.max_nodes:
+                self.__exceeded('max_nodes', self.max_nodes)
+            # the context holds every node being visited, plus the
+            # root type for the format() mode.
+            if self.max_depth is not None and len(self.context) - 1 > self.max_depth:
+                self.__exceeded('max_depth', self.max_depth)
+            # only look at the clock every 64 nodes.
+            if self.timeout is not None and not (self.__nodes & 0x3f):
+                if _clock() - self.__started > self.timeout:
+                    self.__exceeded('timeout', self.timeout)
         retval = super(ASTFormatter, self).visit(node)
+        if self.__budgeted and self.max_output is not None:
+            if not isinstance(retval, list) and len(retval) > self.max_output:
+                self.__exceeded('max_output', self.max_output)
         self.context.pop(0)
+        if self.__tokenizing:
+            toktype = self.__token_type(node)
+            if toktype is not None:
+                retval = "\x02%d\x03%s\x04" % (toktype, retval)
         return retval
 
+    def __token_type(self, node):
+        """Return the token type of the source for a leaf `node`,
+        or None if `node` is not a leaf.
+        """
+        name = node.__class__.__name__
+        if name == 'Constant':
+            value = node.value
+            if isinstance(value, (str, bytes)):
+                return token.STRING
+            if value is None or value is True or value is False:
+                return token.NAME
+            if value is Ellipsis:
+                return token.OP
+            return token.NUMBER
+        return self._token_types.get(name)
+
     def __process_body(self, stmtlist, indent=""):
         """Process a body block consisting of a list of statements
         by visiting all the statements in the list, prepending an
@@ -106,14 +702,51 @@ class ASTFormatter(ast.NodeVisitor):
         block.
         """
         self.indent = len(indent)
+        if self.__deferred is not None and indent and len(stmtlist) > 1:
+            # leave the body to a later step of iterformat(), which
+            # visits it in the context it would have been visited in.
+            self.__deferred.append((stmtlist, indent, list(self.context)))
+            return ["\x05%d\n" % (len(self.__deferred) - 1,)]
         content = []
+        length = 0
         for stmt in stmtlist:
             stmts = self.visit(stmt)
             if not isinstance(stmts, list):
                 stmts = [stmts]
             content += ["%s%s" % (indent, stmt) for stmt in stmts]
+            if self.__budgeted:
+                length += sum([len(stmt) + len(indent) for stmt in stmts])
+                if len(self.context) == 2 and self.__deferred is None:
+                    # this is the outermost body being formatted;
+                    # iterformat() counts its own output.
+                    self.__output = length
+                if self.max_output is not None and length > self.max_output:
+                    self.__exceeded('max_output', self.max_output)
         return content
 
+    def __start_budgets(self):
+        """Reset the budget counters for a call to format() or
+        iterformat().
+        """
+        self.__budgeted = (self.max_nodes is not None
+                or self.max_depth is not None
+                or self.max_output is not None
+                or self.timeout is not None)
+        if self.__budgeted:
+            self.__nodes = 0
+            self.__output = 0
+        else:
+            # nothing is counted without a budget.
+            self.__nodes = self.__output = None
+        self.__started = _clock()
+
+    def __exceeded(self, budget, limit):
+        """Raise FormatBudgetExceeded for the named budget, reporting
+        how far formatting got.
+        """
+        raise FormatBudgetExceeded(budget, limit, self.__nodes, self.__output,
+                _clock() - self.__started, list(self.context))
+
     def generic_visit(self, node):
         assert False, "ASTFormatter found an unknown node type " + type(node).__name__
 
@@ -122,34 +755,63 @@ class ASTFormatter(ast.NodeVisitor):
     # each precedence is an integer, with higher values for
     # higher precedence operators.
 
-    # the __precedence_list is a list of tuples of node types, in order
-    # lowest priority to highest.  It is used to build the _precedence map.
-    __precedence_list = (
-        (ast.Lambda,),
-        (ast.IfExp,),
-        (ast.Or,),
-        (ast.And,),
-        (ast.Not,),
-        (ast.In, ast.NotIn, ast.Is, ast.IsNot, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.NotEq, ast.Eq, ast.Compare,),
-        (ast.BitOr,),
-        (ast.BitXor,),
-        (ast.BitAnd,),
-        (ast.LShift, ast.RShift,),
-        (ast.Add, ast.Sub,),
-        (ast.Mult, ast.Div, ast.Mod, ast.FloorDiv,),
-        (ast.UAdd, ast.USub, ast.Invert,),
-        (ast.Pow,),
-        (ast.Subscript, ast.Slice, ast.Call, ast.Attribute,),
-        (ast.Tuple, ast.List, ast.Dict,) + (((sys.version_info[0] < 3) and (ast.Repr,)) or ()) ,
-    )
-
     # _precedence maps node types to a precedence number; higher values
     # mean higher precedence.  For example, ast.Mult and ast.Div will
-    # have higher precedence values thatn ast.Add and ast.Sub.
-    _precedence = {}
-    for __precedence_value in range(len(__precedence_list)):
-      for __token in __precedence_list[__precedence_value]:
-        _precedence[__token] = __precedence_value
+    # have higher precedence values thatn ast.Add and ast.Sub.  The
+    # groups are listed in order, lowest priority to highest.
+    _precedence = {
+        ast.Lambda: 0,
+        ast.IfExp: 1,
+        ast.Or: 2,
+        ast.And: 3,
+        ast.Not: 4,
+        ast.In: 5, ast.NotIn: 5, ast.Is: 5, ast.IsNot: 5, ast.Lt: 5, ast.LtE: 5, ast.Gt: 5, ast.GtE: 5, ast.NotEq: 5, ast.Eq: 5, ast.Compare: 5,
+        ast.BitOr: 6,
+        ast.BitXor: 7,
+        ast.BitAnd: 8,
+        ast.LShift: 9, ast.RShift: 9,
+        ast.Add: 10, ast.Sub: 10,
+        ast.Mult: 11, ast.Div: 11, ast.Mod: 11, ast.FloorDiv: 11,
+        ast.UAdd: 12, ast.USub: 12, ast.Invert: 12,
+        ast.Pow: 13,
+        ast.Subscript: 14, ast.Slice: 14, ast.Call: 14, ast.Attribute: 14,
+        ast.Tuple: 15, ast.List: 15, ast.Dict: 15,
+    }
+    if sys.version_info[0] < 3:
+        _precedence[ast.Repr] = 15
+
+    ####################################################################
+    # token types of leaf nodes, used by tokens().
+
+    # _token_types maps leaf node type names to the `token` module type
+    # of their formatted source.  Node types are looked up by name so
+    # that node types which no longer exist need not be referenced.
+    _token_types = {
+        'Name': token.NAME,
+        'NameConstant': token.NAME,
+        'Num': token.NUMBER,
+        'Str': token.STRING,
+        'Bytes': token.STRING,
+        'Ellipsis': token.OP,
+        'Add': token.OP, 'Sub': token.OP, 'Mult': token.OP, 'Div': token.OP,
+        'Mod': token.OP, 'Pow': token.OP, 'FloorDiv': token.OP,
+        'LShift': token.OP, 'RShift': token.OP,
+        'BitOr': token.OP, 'BitXor': token.OP, 'BitAnd': token.OP,
+        'UAdd': token.OP, 'USub': token.OP, 'Invert': token.OP,
+        'Eq': token.OP, 'NotEq': token.OP, 'Lt': token.OP, 'LtE': token.OP,
+        'Gt': token.OP, 'GtE': token.OP,
+    }
+
+    # re_token_scan splits formatted source back into tokens.  Leaf
+    # nodes are marked up by visit() as \x02type\x03text\x04; all
+    # other text comes from the statement and expression templates.
+    re_token_scan = _LazyRegex(
+        r'(?su)\x02(?P<marktype>[0-9]+)\x03(?P<marked>.*?)\x04'
+        r'|\n(?P<indent> *)'
+        r'|(?P<space> +)'
+        r'|(?P<name>[^\W\d]\w*)'
+        r'|(?P<number>\d\w*)'
+        r'|\*\*|\.\.\.|[^\s\w]')
 
     # the __parens method accepts an operand and the operator which is
     # operating on the operand.  if the operand's type has a lower
@@ -264,15 +926,20 @@ class ASTFormatter(ast.NodeVisitor):
     def visit_Div(self, node):
         return "/"
 
-    re_docstr_escape = re.compile(r'([\\"])')
-    re_docstr_remove_blank_front = re.compile(r'^[ \n]*')
-    re_docstr_remove_blank_back = re.compile(r'[ \n]*$')
-    re_docstr_indent = re.compile(r'^( *).*')
+    re_docstr_escape = _LazyRegex(r'([\\"])')
+    re_docstr_remove_blank_front = _LazyRegex(r'^[ \n]*')
+    re_docstr_remove_blank_back = _LazyRegex(r'[ \n]*$')
+    re_docstr_indent = _LazyRegex(r'^( *).*')
+    # re_docstr_control matches the NUL character, which may not appear
+    # in source code, and the characters which tokens() and iterformat()
+    # use to mark up the formatted source.
+    re_docstr_control = _LazyRegex(r'[\x00-\x05]')
     def visit_DocStr(self, node):
         """an artificial visitor method, called by visit_Expr if its value is a string."""
         docstring = self.re_docstr_remove_blank_front.sub('',
                 self.re_docstr_remove_blank_back.sub('',
-                        self.re_docstr_escape.sub(r'\\\1', node.s))).split('\n')
+                        self.re_docstr_control.sub(lambda match: '\\x%02x' % (ord(match.group()),),
+                                self.re_docstr_escape.sub(r'\\\1', node.s)))).split('\n')
         if len(docstring) > 1:
             docstr_indents = [
                 len(self.re_docstr_indent.sub(r'\1', ds)) for ds in [
@@ -283,6 +950,9 @@ class ASTFormatter(ast.NodeVisitor):
             docstring = ['"""%s\n' % (docstring[0],)] + ["%s\n" % (ds[docstr_indent:],) for ds in docstring[1:]] + ['"""\n']
         else:
             docstring = ['"""%s"""\n' % (docstring[0],)]
+        if self.__tokenizing:
+            docstring[0] = "\x02%d\x03%s" % (token.STRING, docstring[0])
+            docstring[-1] = "%s\x04\n" % (docstring[-1][:-1],)
         return docstring
 
     def visit_Ellipsis(self, node):
@@ -613,7 +1283,7 @@ class ASTFormatter(ast.NodeVisitor):
         if orelse is not None and len(orelse) > 0:
             retval.extend(["else:\n"] + self.__process_body(orelse, "    "))
         final = getattr(node, 'finalbody', None)
-        if final is not None:
+        if final is not None and len(final) > 0:
             retval.extend( ["finally:\n"] + self.__process_body(node.finalbody, "    ") )
         return retval
 
@@ -0,0 +1,50 @@
+"""Asyncio support for ASTFormatter.
+
+The aformat() coroutine generates the source for an AST tree in chunks,
+yielding to the event loop between them so that formatting a large
+module does not block other tasks::
+
+    from astformatter.aio import aformat
+
+    async for chunk in aformat(tree, mode='exec'):
+        out.write(chunk)
+
+This module requires Python 3.6 or later.
+"""
+
+import asyncio
+
+from astformatter import ASTFormatter, _clock
+
+__all__ = ('aformat',)
+
+# _get_running_loop returns the event loop running the current coroutine.
+_get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+async def aformat(AST, mode='exec', formatter=None, timeslice=0.005, offload=False, executor=None):
+    """Accept an AST tree and asynchronously generate the same source as
+    `formatter.format()` (by default, a new ASTFormatter), in chunks.
+    The statements of the tree are formatted by `formatter.iterformat()`
+    for up to `timeslice` seconds at a time; each chunk holds the source
+    formatted in one time slice, and control returns to the event loop
+    after each chunk.  If `offload` is true, the whole tree is instead
+    formatted by `formatter.format()` in `executor` (by default, the
+    event loop's default executor) and generated as a single chunk.
+    """
+    if formatter is None:
+        formatter = ASTFormatter()
+    if offload:
+        loop = _get_running_loop()
+        yield await loop.run_in_executor(executor, formatter.format, AST, mode)
+        return
+    chunks = []
+    started = _clock()
+    for chunk in formatter.iterformat(AST, mode):
+        chunks.append(chunk)
+        if _clock() - started >= timeslice:
+            yield "".join(chunks)
+            chunks = []
+            await asyncio.sleep(0)
+            started = _clock()
+    if chunks:
+        yield "".join(chunks)
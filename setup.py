@@ -1,24 +1,46 @@
 """The setuptools module for ASTFormatter.
 """
 
-from setuptools import setup
+from setuptools import setup, Command
 
 from codecs import open
 from os import path
+import re
 
-from astformatter import ASTFormatter
+here = path.abspath(path.dirname(__file__))
 
-long_description = getattr(ASTFormatter, '__doc__', "").lstrip().rstrip('\n').split('\n')
-if len(long_description) > 1:
-    indent = len(long_description[1]) - len(long_description[1].lstrip())
-    long_description[1:] = [desc[indent:] for desc in long_description[1:]]
-long_description = '\n'.join(long_description).rstrip('\n')
+# read the version and description from the source and README.rst
+# rather than importing astformatter, so that running setup.py has no
+# side effects.
+version = re.search(r"^    __version__ = '([^']*)'$",
+        open(path.join(here, 'astformatter', '__init__.py'), encoding='utf-8').read(), re.M).group(1)
 
-open('README.rst', 'w').write(long_description + '\n')
+long_description = open(path.join(here, 'README.rst'), encoding='utf-8').read().rstrip('\n')
+
+class readme(Command):
+    """Regenerate README.rst from the ASTFormatter class docstring."""
+
+    description = 'regenerate README.rst from the ASTFormatter docstring'
+    user_options = []
+
+    def initialize_options(self):
+        pass
+
+    def finalize_options(self):
+        pass
+
+    def run(self):
+        from astformatter import ASTFormatter
+        long_description = getattr(ASTFormatter, '__doc__', "").lstrip().rstrip('\n').split('\n')
+        if len(long_description) > 1:
+            indent = len(long_description[1]) - len(long_description[1].lstrip())
+            long_description[1:] = [desc[indent:] for desc in long_description[1:]]
+        long_description = '\n'.join(long_description).rstrip('\n')
+        open(path.join(here, 'README.rst'), 'w', encoding='utf-8').write(long_description + '\n')
 
 setup(
     name = 'ASTFormatter' ,
-    version = ASTFormatter.__version__ ,
+    version = version ,
     description = 'The ASTFormatter class accepts an AST tree and returns a valid source code representation of that tree.' ,
     long_description = long_description ,
     url = 'https://github.com/darkfoxprime/python-astformatter' ,
@@ -42,4 +64,5 @@ setup(
     package_data = {} ,
     data_files = [] ,
     entry_points = {} ,
+    cmdclass = { 'readme': readme } ,
 )
@@ -0,0 +1,32 @@
+"""Coroutines for the asyncio steps in tests/steps/iterformat_test.py.
+They live outside the steps directory so that behave can still load
+the steps under python 2, which cannot parse async syntax.
+"""
+
+import asyncio
+
+from astformatter.aio import aformat
+
+async def collect(AST, **options):
+    """Return the chunks generated by aformat()."""
+    return [chunk async for chunk in aformat(AST, **options)]
+
+async def collect_with_ticker(AST, **options):
+    """Return the chunks generated by aformat(), and the number of times
+    a concurrent task ran while they were being generated.
+    """
+    ticks = [0]
+    done = []
+    async def ticker():
+        while not done:
+            ticks[0] += 1
+            await asyncio.sleep(0)
+    task = asyncio.ensure_future(ticker())
+    # let the ticker start before formatting does.
+    await asyncio.sleep(0)
+    started = ticks[0]
+    chunks = [chunk async for chunk in aformat(AST, **options)]
+    ticked = ticks[0] - started
+    done.append(True)
+    await task
+    return (chunks, ticked)
@@ -155,6 +155,17 @@ Feature: Generate proper Python code
         | source input                                          | output snippet                                            |
         | foo(x, y=1, *z, **q)                                  | foo(x, *z, y=1, **q)                                      |
 
+    Scenario Outline: Empty optional clauses should be left out
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to source,
+         then the output should not include "<output snippet>".
+
+    Examples:
+        | source input                                          | output snippet                                            |
+        | try:\n  pass\nexcept:\n  pass                          | finally:                                                  |
+        | try:\n  pass\nexcept:\n  pass                          | else:                                                     |
+        | for target in x:\n  pass                              | else:                                                     |
+
     Scenario Outline: Operator precedence should be taken into account
         Given I have parsed an AST tree from "<source input>",
          when I transform the AST tree to source,
@@ -0,0 +1,97 @@
+Feature: Select the backend which formats an AST tree
+    In order to format AST trees with the fastest available engine
+    without changing the formatted output,
+    as a software developer,
+    I want the ASTFormatter class to route each tree to a configured
+    or calibrated backend, and to check the backends against each other.
+
+    Scenario Outline: The astformatter backend should produce the same source
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to source with the astformatter backend,
+         then the output should include "<output snippet>".
+
+    Examples:
+        | source input                                          | output snippet                          |
+        | def foo(x): pass                                      | def foo(x):\n    pass                   |
+        | { foo: x, bar: y }                                    | {foo:x, bar:y}                          |
+
+    Scenario Outline: The auto backend should use the fastest calibrated backend
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to source with the auto backend calibrated to prefer astformatter,
+         then the output should include "<output snippet>".
+
+    Examples:
+        | source input                                          | output snippet                          |
+        | def foo(x): pass                                      | def foo(x):\n    pass                   |
+        | { foo: x, bar: y }                                    | {foo:x, bar:y}                          |
+
+    Scenario: Subclasses with visitor hooks should keep using the astformatter backend
+        Given I have parsed an AST tree from "foo = x",
+         when I transform the AST tree to source with the auto backend of a subclass overriding visit_Name,
+         then the output should include "FOO = X".
+
+    Scenario: Calibration should time every backend
+         When I calibrate the backends,
+         then every backend should have a timing.
+
+    Scenario: Unknown backends should be rejected
+         When I create a formatter with the nonesuch backend,
+         then the formatter should be rejected.
+
+    Scenario Outline: Backends which are not names should be rejected
+         When I create a formatter with backend=<value>,
+         then the formatter should be rejected.
+
+    Examples:
+        | value     |
+        | None      |
+        | 1         |
+        | ('auto',) |
+
+    @v3.9 @v3.10 @v3.11 @v3.12 @v3.13
+    Scenario Outline: The unparse backend should delegate to ast.unparse
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to source with the unparse backend,
+         then the output should include "<output snippet>".
+
+    Examples:
+        | source input                                          | output snippet                                            |
+        | def foo(x): pass                                      | def foo(x):\n    pass\n                                   |
+        | { foo: x, bar: y }                                    | {foo: x, bar: y}                                          |
+
+    @v3.9 @v3.10 @v3.11 @v3.12 @v3.13
+    Scenario: The auto backend should delegate to ast.unparse when it is fastest
+        Given I have parsed an AST tree from "{ foo: x, bar: y }",
+         when I transform the AST tree to source with the auto backend calibrated to prefer unparse,
+         then the output should include "{foo: x, bar: y}".
+
+    @v3.9 @v3.10 @v3.11 @v3.12 @v3.13
+    Scenario Outline: The auto backend should only leave astformatter for a clearly faster backend
+        Given I have parsed an AST tree from "{ foo: x, bar: y }",
+         when I transform the AST tree to source with the auto backend calibrated with unparse taking <ratio> times as long as astformatter,
+         then the output should include "<output snippet>".
+
+    Examples:
+        | ratio | output snippet                          |
+        | 0.9   | {foo:x, bar:y}                          |
+        | 0.6   | {foo:x, bar:y}                          |
+        | 0.5   | {foo: x, bar: y}                        |
+        | 0.1   | {foo: x, bar: y}                        |
+
+    @v3.9 @v3.10 @v3.11 @v3.12 @v3.13
+    Scenario: Sampled checks should accept a backend which reparses to the formatted tree
+        Given I have parsed an AST tree from "def foo():\n  \"\"\"quux\n    foobar\"\"\"",
+         when I transform the AST tree to source with the unparse backend checking every call,
+         then the output should include "quux\n    foobar".
+
+    @v3.9 @v3.10 @v3.11 @v3.12 @v3.13
+    Scenario Outline: The equivalence check should compare the reparsed output of the backends
+        Given I have parsed an AST tree from "<source input>",
+         when I check the backends against the astformatter backend,
+         then the mismatched backends should be "<mismatched>".
+
+    Examples:
+        | source input                                          | mismatched |
+        | def foo(x, y=1):\n  return x ** -y                    | none       |
+        | try:\n  pass\nexcept foo as x:\n  pass                | none       |
+        | def foo():\n  """quux\n    foobar"""                  | none       |
@@ -0,0 +1,96 @@
+Feature: Limit the resources used to format untrusted AST trees
+    In order to safely format AST trees from untrusted sources,
+    as a software developer,
+    I want the ASTFormatter class to stop formatting as soon as it
+    exceeds its node, output or time budget.
+
+    Scenario Outline: Formatting within the budgets should succeed
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to source with <budget>=<limit>,
+         then the output should include "<output snippet>".
+
+    Examples:
+        | source input                                          | budget     | limit | output snippet                          |
+        | def foo(x): pass                                      | max_nodes  | 5     | def foo(x):\n    pass                   |
+        | def foo(x): pass                                      | max_depth  | 4     | def foo(x):\n    pass                   |
+        | def foo(x): pass                                      | max_output | 21    | def foo(x):\n    pass                   |
+        | def foo(x): pass                                      | timeout    | 10    | def foo(x):\n    pass                   |
+
+    Scenario Outline: Formatting beyond the budgets should stop
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to source with <budget>=<limit>,
+         then formatting should stop on the <budget> budget after <nodes> nodes and <output> characters.
+
+    Examples:
+        | source input                                          | budget     | limit | nodes | output |
+        | def foo(x): pass                                      | max_nodes  | 4     | 5     | 0      |
+        | def foo(x): pass                                      | max_depth  | 2     | 3     | 0      |
+        | def foo(x): pass                                      | max_output | 20    | 5     | 21     |
+        | foo = 1\nbar = 2                                      | max_nodes  | 5     | 6     | 8      |
+        | foo = 1\nbar = 2                                      | max_output | 10    | 7     | 16     |
+
+    Scenario Outline: Progress which is not counted should not be reported
+        Given I have parsed an AST expression from "xxxxxx + yyyyyy",
+         when I transform the AST tree to source with <budget>=<limit>,
+         then formatting should stop on the <budget> budget after <nodes> nodes and <output> characters,
+          and formatting should have stopped at depth <depth>.
+
+    Examples:
+        | budget     | limit | nodes | output | depth |
+        | max_output | 5     | 3     | no     | 2     |
+        | max_nodes  | 2     | 3     | no     | 2     |
+        | max_depth  | 1     | 2     | no     | 2     |
+
+    Scenario: Trees too deep to format without a budget should report their depth
+        Given I have built an AST tree of x negated 5000 times,
+         when I transform the AST tree to source with max_depth=None,
+         then formatting should stop on the max_depth budget after no nodes and no characters.
+
+    Scenario Outline: Repeated subtrees should not escape the budgets
+        Given I have built an AST tree of x added to itself 40 times,
+         when I transform the AST tree to source with <budget>=<limit>,
+         then formatting should stop on the <budget> budget.
+
+    Examples:
+        | budget     | limit  |
+        | max_nodes  | 10000  |
+        | max_output | 100000 |
+        | timeout    | 0.01   |
+
+    Scenario Outline: Deep chains should not escape the budgets
+        Given I have built an AST tree of x negated 5000 times,
+         when I transform the AST tree to source with <budget>=<limit>,
+         then formatting should stop on the max_depth budget.
+
+    Examples:
+        | budget     | limit   |
+        | max_depth  | 100     |
+        | max_nodes  | 100000  |
+        | max_output | 1000000 |
+        | timeout    | 1       |
+
+    Scenario Outline: Formatting in chunks should stop when the whole output exceeds the budgets
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to source in chunks with <budget>=<limit>,
+         then formatting should stop on the <budget> budget after <nodes> nodes and <output> characters.
+
+    Examples:
+        | source input                                          | budget     | limit | nodes | output |
+        | foo = 1\nbar = 2\nbaz = 3                              | max_output | 10    | 6     | 16     |
+        | foo = 1\nbar = 2\nbaz = 3                              | max_nodes  | 5     | 6     | 8      |
+        | def foo():\n  x = 1\n  y = 2                           | max_output | 20    | 5     | 21     |
+
+    Scenario: Deep statement nests should not escape the max_depth budget in chunks
+        Given I have built an AST tree of if statements nested 400 times,
+         when I transform the AST tree to source in chunks with max_depth=100,
+         then formatting should stop on the max_depth budget.
+
+    Scenario Outline: Errors raised by visitors should not be reported as exceeding a budget
+        Given I have parsed an AST tree from "raise x",
+         when a visitor raises RuntimeError while I transform the AST tree to source with <budget>=<limit>,
+         then formatting should fail with the visitor's RuntimeError.
+
+    Examples:
+        | budget     | limit |
+        | max_depth  | None  |
+        | max_depth  | 100   |
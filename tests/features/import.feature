@@ -0,0 +1,14 @@
+Feature: Import astformatter quickly
+    In order to use ASTFormatter in short-lived processes,
+    as a software developer,
+    I want importing the astformatter package to be cheap and free of
+    side effects.
+
+    Scenario: Importing astformatter should only load the modules it needs
+         When I import astformatter in a new python process after ast,
+         then it should load no modules other than astformatter and token.
+
+    @v3.7 @v3.8 @v3.9 @v3.10 @v3.11 @v3.12 @v3.13
+    Scenario: Importing astformatter should stay within its import time budget
+         When I time importing astformatter in a new python process,
+         then importing astformatter should take less than 4000 microseconds beyond importing ast.
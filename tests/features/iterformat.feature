@@ -0,0 +1,57 @@
+Feature: Generate Python code in chunks
+    In order to format large modules without blocking other work,
+    as a software developer,
+    I want the ASTFormatter class to be able to generate the Python
+    code for an AST tree one statement at a time, synchronously or
+    from an asyncio event loop.
+
+    Scenario Outline: The chunks should join to the formatted source
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to source in chunks,
+         then the chunks should join to the formatted source,
+          and there should be <count> chunks.
+
+    Examples:
+        | source input                                                  | count |
+        | foo = x                                                       | 1     |
+        | foo = x\nbar = y                                              | 2     |
+        | def foo(x): pass                                              | 1     |
+        | def foo(x):\n  y = x\n  return y                              | 3     |
+        | class foo(object):\n  """quux\n  foobar"""\n  def bar(self):\n    x = 1\n    return x | 5 |
+        | if foo:\n  x\n  y\nelif bar:\n  x\n  y\nelse:\n  x\n  y      | 9     |
+        | with foo as x:\n  with bar:\n    x\n    y                    | 3     |
+        | try:\n  x\n  y\nexcept foo as x:\n  x\n  y\nfinally:\n  x\n  y | 9   |
+
+    Scenario Outline: Subclasses overriding statement visitors should get the formatted source in one chunk
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to source in chunks with a subclass overriding <methods>,
+         then the chunks should join to the formatted source,
+          and there should be <count> chunks.
+
+    Examples:
+        | source input                                          | methods                                | count |
+        | def foo(x):\n  y = x\n  return y                      | visit_Module and visit_FunctionDef     | 1     |
+        | def foo(x):\n  y = x\n  return y                      | visit_FunctionDef                      | 1     |
+        | def foo(x):\n  y = x\n  return y                      | visit_Module                           | 1     |
+        | def foo(x):\n  y = x\n  return y                      | visit_Name                             | 3     |
+        | def foo(x):\n  y = x\n  return y\nz = y               | visit_Name in function                 | 4     |
+
+    @v3.7 @v3.8 @v3.9 @v3.10 @v3.11 @v3.12 @v3.13
+    Scenario Outline: The asynchronous chunks should join to the formatted source
+        Given I have parsed an AST tree from "<source input>",
+         when I asynchronously transform the AST tree to source <how>,
+         then the chunks should join to the formatted source,
+          and there should be <count> chunks.
+
+    Examples:
+        | source input                                          | how                         | count |
+        | def foo(x):\n  y = x\n  return y                      | yielding after every step   | 3     |
+        | def foo(x):\n  y = x\n  return y                      | yielding after long slices  | 1     |
+        | def foo(x):\n  y = x\n  return y                      | in an executor              | 1     |
+
+    @v3.7 @v3.8 @v3.9 @v3.10 @v3.11 @v3.12 @v3.13
+    Scenario: Other tasks should run while a module is formatted asynchronously
+        Given I have parsed an AST tree from "foo = x\nbar = y\nbaz = z\nquux = w\ndef foo(x):\n  y = x\n  return y",
+         when another task runs while I asynchronously transform the AST tree to source yielding after every step,
+         then the chunks should join to the formatted source,
+          and the other task should have run at least 6 times while formatting.
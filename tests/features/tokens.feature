@@ -0,0 +1,62 @@
+Feature: Generate a token stream of Python code
+    In order to highlight, minify or diff formatted Python code
+    without tokenizing it again,
+    as a software developer,
+    I want the ASTFormatter class to be able to generate the tokens
+    of the Python code for any given AST tree.
+
+    Scenario Outline: The token stream should render to the formatted source
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to tokens,
+         then the tokens should render to the formatted source.
+
+    Examples:
+        | source input                                          |
+        | def foo(x, y=1): return x                             |
+        | class foo(object):\n  """quux\n  foobar"""\n  pass    |
+        | if foo:\n  pass\nelif foo:\n  pass\nelse:\n  pass     |
+        | foo += x ** -y                                        |
+        | x[1:2] != "foo" and not y is not None                 |
+        | def foo():\n  "a\x04b\x02c\x05"                        |
+
+    Scenario Outline: The token stream should match the tokenize module
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to tokens,
+         then the tokens should match the tokenized formatted source.
+
+    Examples:
+        | source input                                          |
+        | def foo(x, y=1): return x                             |
+        | class foo(object):\n  """quux\n  foobar"""\n  pass    |
+        | while foo:\n  if x:\n    break\nelse:\n  pass         |
+        | foo += x ** -y                                        |
+        | foo <<= 1.5                                           |
+        | x[1:2] != "foo" and not y is not None                 |
+        | def foo():\n  "a\x04b\x02c\x05"                        |
+        | foo = {x: [y, 'z'], 1: (2,)}                          |
+
+    Scenario Outline: Leaf nodes should produce typed tokens
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to tokens,
+         then the tokens should include a <token type> token "<token text>".
+
+    Examples:
+        | source input                                          | token type | token text |
+        | foo = x                                               | NAME       | foo        |
+        | foo = x                                               | OP         | =          |
+        | foo == x                                              | OP         | ==         |
+        | foo = 123                                             | NUMBER     | 123        |
+        | foo = "bar"                                           | STRING     | 'bar'      |
+        | foo = None                                            | NAME       | None       |
+
+    Scenario Outline: Statement layout should produce NEWLINE, INDENT and DEDENT tokens
+        Given I have parsed an AST tree from "<source input>",
+         when I transform the AST tree to tokens,
+         then the tokens should include a <token type> token.
+
+    Examples:
+        | source input                                          | token type |
+        | pass                                                  | NEWLINE    |
+        | if foo:\n  pass                                       | INDENT     |
+        | if foo:\n  pass                                       | DEDENT     |
+        | pass                                                  | ENDMARKER  |
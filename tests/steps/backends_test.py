@@ -0,0 +1,86 @@
+from behave import *
+from astformatter import ASTFormatter
+import ast
+
+class NameHookFormatter(ASTFormatter):
+    def visit_Name(self, node):
+        return node.id.upper()
+
+def calibrated(fastest):
+    """Return calibration timings in which `fastest` is the fastest
+    backend.
+    """
+    return dict([(backend, (backend != fastest) and 1.0 or 0.0) for backend in ASTFormatter.backends()])
+
+@when("I transform the AST tree to source with the {backend} backend,")
+def when_I_transform_the_tree_to_source_with_a_backend(context, backend):
+    context.formatted = ASTFormatter(backend=backend).format(context.tree)
+
+@when("I transform the AST tree to source with the {backend} backend checking every call,")
+def when_I_transform_the_tree_to_source_checking_every_call(context, backend):
+    context.formatted = ASTFormatter(backend=backend, verify=1).format(context.tree)
+
+@when("I transform the AST tree to source with the auto backend calibrated to prefer {fastest},")
+def when_I_transform_the_tree_to_source_calibrated(context, fastest):
+    calibration = ASTFormatter.__dict__['_calibration']
+    ASTFormatter._calibration = calibrated(fastest)
+    try:
+        context.formatted = ASTFormatter(backend='auto').format(context.tree)
+    finally:
+        ASTFormatter._calibration = calibration
+
+@when("I transform the AST tree to source with the auto backend calibrated with unparse taking {ratio:g} times as long as astformatter,")
+def when_I_transform_the_tree_to_source_calibrated_with_a_ratio(context, ratio):
+    calibration = ASTFormatter.__dict__['_calibration']
+    ASTFormatter._calibration = {'astformatter': 1.0, 'unparse': ratio}
+    try:
+        context.formatted = ASTFormatter(backend='auto').format(context.tree)
+    finally:
+        ASTFormatter._calibration = calibration
+
+@when("I transform the AST tree to source with the {backend} backend of a subclass overriding visit_Name,")
+def when_I_transform_the_tree_to_source_with_a_subclass(context, backend):
+    calibration = NameHookFormatter.__dict__.get('_calibration')
+    # make every other backend look faster.
+    NameHookFormatter._calibration = dict([(name, (name == 'astformatter') and 1.0 or 0.0) for name in ASTFormatter.backends()])
+    try:
+        context.formatted = NameHookFormatter(backend=backend).format(context.tree)
+    finally:
+        NameHookFormatter._calibration = calibration
+
+@when("I calibrate the backends,")
+def when_I_calibrate_the_backends(context):
+    calibration = ASTFormatter.__dict__['_calibration']
+    try:
+        context.timings = ASTFormatter.calibrate(number=1)
+    finally:
+        ASTFormatter._calibration = calibration
+
+@then("every backend should have a timing.")
+def then_every_backend_should_have_a_timing(context):
+    assert sorted(context.timings) == sorted(ASTFormatter.backends()), ("%r" % (context.timings,))
+
+@when("I create a formatter with the {backend} backend,")
+def when_I_create_a_formatter_with_a_backend(context, backend):
+    context.rejected = None
+    try:
+        ASTFormatter(backend=backend)
+    except ValueError as e:
+        context.rejected = e
+
+@when("I create a formatter with backend={value},")
+def when_I_create_a_formatter_with_a_backend_value(context, value):
+    when_I_create_a_formatter_with_a_backend(context, ast.literal_eval(value))
+
+@then("the formatter should be rejected.")
+def then_the_formatter_should_be_rejected(context):
+    assert context.rejected is not None, "the formatter was not rejected"
+
+@when("I check the backends against the astformatter backend,")
+def when_I_check_the_backends(context):
+    context.mismatched = ASTFormatter().check_backends(context.tree)
+
+@then("the mismatched backends should be \"{mismatched}\".")
+def then_the_mismatched_backends_should_be(context, mismatched):
+    mismatched = [backend for backend in mismatched.split() if backend != 'none']
+    assert context.mismatched == mismatched, ("%r != %r" % (context.mismatched, mismatched))
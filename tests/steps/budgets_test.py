@@ -0,0 +1,95 @@
+from behave import *
+from astformatter import ASTFormatter, FormatBudgetExceeded
+import ast
+
+@given("I have parsed an AST expression from \"{source}\",")
+def given_an_expression(context, source):
+    context.tree = ast.parse(source, mode='eval')
+
+@given("I have built an AST tree of x added to itself {count:d} times,")
+def given_a_repeated_subtree(context, count):
+    node = ast.Name(id='x', ctx=ast.Load())
+    for i in range(count):
+        node = ast.BinOp(left=node, op=ast.Add(), right=node)
+    context.tree = ast.Expression(body=node)
+
+@given("I have built an AST tree of x negated {count:d} times,")
+def given_a_deep_chain(context, count):
+    node = ast.Name(id='x', ctx=ast.Load())
+    for i in range(count):
+        node = ast.UnaryOp(op=ast.USub(), operand=node)
+    context.tree = ast.Expression(body=node)
+
+@given("I have built an AST tree of if statements nested {count:d} times,")
+def given_a_deep_statement_nest(context, count):
+    expr = lambda: ast.Expr(value=ast.Name(id='x', ctx=ast.Load()))
+    body = [expr(), expr()]
+    for i in range(count):
+        body = [ast.If(test=ast.Name(id='x', ctx=ast.Load()), body=body, orelse=[]), expr()]
+    context.tree = ast.Module(body=body)
+
+@when("I transform the AST tree to source with {budget}={limit},")
+def when_I_transform_the_tree_to_source_with_a_budget(context, budget, limit):
+    formatter = ASTFormatter(**{budget: ast.literal_eval(limit)})
+    context.exceeded = None
+    try:
+        if isinstance(context.tree, ast.Expression):
+            context.formatted = formatter.format(context.tree.body, mode='eval')
+        else:
+            context.formatted = formatter.format(context.tree)
+    except FormatBudgetExceeded as e:
+        context.exceeded = e
+    assert formatter.context == [], ("%r left in context" % (formatter.context,))
+
+@when("I transform the AST tree to source in chunks with {budget}={limit},")
+def when_I_transform_the_tree_to_source_in_chunks_with_a_budget(context, budget, limit):
+    formatter = ASTFormatter(**{budget: ast.literal_eval(limit)})
+    context.exceeded = None
+    context.chunks = []
+    try:
+        for chunk in formatter.iterformat(context.tree):
+            context.chunks.append(chunk)
+    except FormatBudgetExceeded as e:
+        context.exceeded = e
+    assert formatter.context == [], ("%r left in context" % (formatter.context,))
+
+class RaisingFormatter(ASTFormatter):
+    def visit_Raise(self, node):
+        raise RuntimeError("visit_Raise failed")
+
+@when("a visitor raises RuntimeError while I transform the AST tree to source with {budget}={limit},")
+def when_a_visitor_raises_while_I_transform_the_tree_to_source(context, budget, limit):
+    formatter = RaisingFormatter(**{budget: ast.literal_eval(limit)})
+    context.raised = None
+    try:
+        formatter.format(context.tree)
+    except Exception as e:
+        context.raised = e
+
+@then("formatting should fail with the visitor's RuntimeError.")
+def then_formatting_should_fail_with_the_visitors_error(context):
+    assert type(context.raised) is RuntimeError, ("%r raised" % (context.raised,))
+    assert str(context.raised) == "visit_Raise failed", ("%r raised" % (context.raised,))
+
+@then("formatting should stop on the {budget} budget.")
+def then_formatting_should_stop(context, budget):
+    assert context.exceeded is not None, "formatting was not stopped"
+    assert context.exceeded.budget == budget, ("%r != %r" % (context.exceeded.budget, budget))
+
+def counted(count):
+    """Return the number written as `count`, or None for "no"."""
+    if count == "no":
+        return None
+    return int(count)
+
+@then("formatting should stop on the {budget} budget after {nodes} nodes and {output} characters,")
+@then("formatting should stop on the {budget} budget after {nodes} nodes and {output} characters.")
+def then_formatting_should_stop_after(context, budget, nodes, output):
+    then_formatting_should_stop(context, budget)
+    assert context.exceeded.nodes == counted(nodes), ("%r != %r nodes" % (context.exceeded.nodes, nodes))
+    assert context.exceeded.output == counted(output), ("%r != %r characters" % (context.exceeded.output, output))
+
+@then("formatting should have stopped at depth {depth:d}.")
+def then_formatting_should_have_stopped_at_depth(context, depth):
+    assert context.exceeded.depth == depth, ("%r != %r" % (context.exceeded.depth, depth))
+    assert (" at depth %d " % (depth,)) in str(context.exceeded), str(context.exceeded)
@@ -28,3 +28,7 @@ def when_I_transform_the_tree_to_source(context):
 @then("the output should include \"{output}\".")
 def then_the_output_should_include(context, output):
     assert decode_escapes(output) in context.formatted, ("%r not in %r" % (output, context.formatted))
+
+@then("the output should not include \"{output}\".")
+def then_the_output_should_not_include(context, output):
+    assert decode_escapes(output) not in context.formatted, ("%r in %r" % (output, context.formatted))
@@ -0,0 +1,47 @@
+from behave import *
+import compileall
+import os
+import subprocess
+import sys
+
+package_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def run_python(*args):
+    """Run a new python process in the package directory and return
+    its standard output and standard error.
+    """
+    process = subprocess.Popen((sys.executable,) + args, cwd=package_dir,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    (stdout, stderr) = process.communicate()
+    assert process.returncode == 0, stderr
+    return (stdout, stderr)
+
+@when("I import astformatter in a new python process after ast,")
+def when_I_import_astformatter_after_ast(context):
+    (stdout, stderr) = run_python('-c',
+            'import sys, ast; before = set(sys.modules); import astformatter; print(" ".join(sorted(set(sys.modules) - before)))')
+    context.modules = stdout.split()
+
+@then("it should load no modules other than astformatter and token.")
+def then_it_should_load_no_other_modules(context):
+    extra = [module for module in context.modules if module not in ('astformatter', 'token')]
+    assert not extra, ("%r were also imported" % (extra,))
+
+@when("I time importing astformatter in a new python process,")
+def when_I_time_importing_astformatter(context):
+    # time the import of compiled bytecode, not of the source.
+    compileall.compile_dir(os.path.join(package_dir, 'astformatter'), force=True, quiet=1)
+    context.import_times = []
+    for i in range(5):
+        (stdout, stderr) = run_python('-X', 'importtime', '-c', 'import astformatter')
+        cumulative = {}
+        for line in stderr.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                (self_us, cumulative_us, name) = line[len('import time:'):].split('|')
+                if cumulative_us.strip().isdigit():
+                    cumulative[name.strip()] = int(cumulative_us)
+        context.import_times.append(cumulative['astformatter'] - cumulative.get('ast', 0))
+
+@then("importing astformatter should take less than {budget:d} microseconds beyond importing ast.")
+def then_importing_astformatter_should_take_less_than(context, budget):
+    assert min(context.import_times) < budget, ("%r microseconds" % (context.import_times,))
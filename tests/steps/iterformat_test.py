@@ -0,0 +1,79 @@
+from behave import *
+from astformatter import ASTFormatter
+import ast
+import os
+import sys
+
+def wrap_Module(self, node):
+    return ["# header\n"] + ASTFormatter.visit_Module(self, node)
+
+def wrap_FunctionDef(self, node):
+    lines = ASTFormatter.visit_FunctionDef(self, node)
+    return ["# begin\n"] + lines + ["# end %d lines\n" % (len(lines),)]
+
+def wrap_Name(self, node):
+    return node.id.upper()
+
+def wrap_Name_in_function(self, node):
+    if ast.FunctionDef in self.context:
+        return "local_" + node.id
+    return node.id
+
+def wrapping_formatter(methods):
+    """Return a subclass of ASTFormatter which overrides each of the
+    visitor `methods` with the matching wrap_ function.
+    """
+    return type('WrappingFormatter', (ASTFormatter,), dict([
+        (method.split(" ")[0], globals()['wrap_' + method[len('visit_'):].replace(" ", "_")])
+        for method in methods
+    ]))
+
+@when("I transform the AST tree to source in chunks,")
+def when_I_transform_the_tree_to_source_in_chunks(context):
+    context.formatted = ASTFormatter().format(context.tree)
+    context.chunks = list(ASTFormatter().iterformat(context.tree))
+
+def aio_support():
+    """Import the asyncio coroutines from tests/aio_support.py."""
+    tests_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if tests_dir not in sys.path:
+        sys.path.insert(0, tests_dir)
+    import aio_support
+    return aio_support
+
+aformat_options = {
+    'yielding after every step': {'timeslice': 0},
+    'yielding after long slices': {'timeslice': 60},
+    'in an executor': {'offload': True},
+}
+
+@when("I asynchronously transform the AST tree to source {how},")
+def when_I_asynchronously_transform_the_tree_to_source(context, how):
+    import asyncio
+    context.formatted = ASTFormatter().format(context.tree)
+    context.chunks = asyncio.run(aio_support().collect(context.tree, **aformat_options[how]))
+
+@when("another task runs while I asynchronously transform the AST tree to source {how},")
+def when_I_asynchronously_transform_the_tree_to_source_alongside_a_task(context, how):
+    import asyncio
+    context.formatted = ASTFormatter().format(context.tree)
+    (context.chunks, context.ticked) = asyncio.run(
+            aio_support().collect_with_ticker(context.tree, **aformat_options[how]))
+
+@when("I transform the AST tree to source in chunks with a subclass overriding {methods},")
+def when_I_transform_the_tree_to_source_in_chunks_with_a_subclass(context, methods):
+    formatter = wrapping_formatter(methods.split(" and "))()
+    context.formatted = formatter.format(context.tree)
+    context.chunks = list(formatter.iterformat(context.tree))
+
+@then("the other task should have run at least {count:d} times while formatting.")
+def then_the_other_task_should_have_run(context, count):
+    assert context.ticked >= count, ("the other task ran %d times" % (context.ticked,))
+
+@then("the chunks should join to the formatted source,")
+def then_the_chunks_should_join_to_the_formatted_source(context):
+    assert "".join(context.chunks) == context.formatted, ("%r != %r" % (context.chunks, context.formatted))
+
+@then("there should be {count:d} chunks.")
+def then_there_should_be_chunks(context, count):
+    assert len(context.chunks) == count, ("%d != %d in %r" % (len(context.chunks), count, context.chunks))
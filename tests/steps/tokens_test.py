@@ -0,0 +1,45 @@
+from behave import *
+from astformatter import ASTFormatter, WHITESPACE
+import token
+import tokenize
+
+try:
+  "".decode
+  def decode_escapes(s):
+    return s.decode('string_escape')
+except AttributeError:
+  def decode_escapes(s):
+    return bytes(s, "utf-8").decode('unicode_escape')
+
+try:
+  from StringIO import StringIO
+except ImportError:
+  from io import StringIO
+
+@when("I transform the AST tree to tokens,")
+def when_I_transform_the_tree_to_tokens(context):
+    context.formatted = ASTFormatter().format(context.tree)
+    context.tokens = ASTFormatter().tokens(context.tree)
+
+@then("the tokens should render to the formatted source.")
+def then_the_tokens_should_render_to_the_formatted_source(context):
+    assert context.tokens.render() == context.formatted, ("%r != %r" % (context.tokens.render(), context.formatted))
+
+@then("the tokens should match the tokenized formatted source.")
+def then_the_tokens_should_match_the_tokenized_source(context):
+    expected = [
+        (tok[0], tok[1]) for tok in tokenize.generate_tokens(StringIO(context.formatted).readline)
+        if tok[0] not in (tokenize.NL, tokenize.COMMENT)
+    ]
+    tokens = [tok for tok in context.tokens if tok[0] != WHITESPACE]
+    assert tokens == expected, ("%r != %r" % (tokens, expected))
+
+@then("the tokens should include a {toktype} token \"{text}\".")
+def then_the_tokens_should_include(context, toktype, text):
+    tok = (getattr(token, toktype), decode_escapes(text))
+    assert tok in list(context.tokens), ("%r not in %r" % (tok, list(context.tokens)))
+
+@then("the tokens should include a {toktype} token.")
+def then_the_tokens_should_include_type(context, toktype):
+    toktype = getattr(token, toktype)
+    assert toktype in [tok[0] for tok in context.tokens], ("%r not in %r" % (toktype, list(context.tokens)))